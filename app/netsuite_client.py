@@ -4,6 +4,7 @@
 # Importaciones estándar y dependencias
 # ==========================================================
 import time
+import json
 import base64
 import requests
 import logging
@@ -15,6 +16,7 @@ from app.config import (
     NETSUITE_REFRESH_TOKEN,
 )
 from app.redis_client import redis, kv_get, kv_set
+from app.services.aggregates import compute_aggregates
 import threading
 
 # Logger específico del módulo
@@ -295,6 +297,14 @@ def _call_restlet_sync(script_id: str, deploy_id: str = "1", params: dict | None
 # ==========================================================
 # Cache Distribuido + Lock Local (modificado para params)
 # ==========================================================
+def _cache_key(prefix: str, script_id: str, params: dict | None = None) -> str:
+    """
+    Construye la clave de cache incluyendo params para
+    diferenciar queries del mismo Restlet.
+    """
+    return f"{prefix}:{script_id}:{json.dumps(params or {}, sort_keys=True)}"
+
+
 def call_restlet_with_cache(script_id: str, ttl: int = 300, params: dict | None = None):
     """
     Wrapper que agrega:
@@ -304,10 +314,7 @@ def call_restlet_with_cache(script_id: str, ttl: int = 300, params: dict | None
     - Params dinámicos que afectan la cache
     """
 
-    import json
-
-    # La clave de cache ahora incluye params para diferenciar queries
-    cache_key = f"cache:{script_id}:{json.dumps(params or {}, sort_keys=True)}"
+    cache_key = _cache_key("cache", script_id, params)
 
     cached = kv_get(cache_key)
     if cached:
@@ -337,4 +344,84 @@ def call_restlet_with_cache(script_id: str, ttl: int = 300, params: dict | None
             f"Datos almacenados en cache para script {script_id}. TTL: {ttl} segundos. Params: {params}"
         )
 
-        return data
\ No newline at end of file
+        # Los agregados se materializan junto al payload y con el mismo TTL
+        _materializar_aggregates(script_id, data, ttl, params)
+
+        return data
+
+
+def _materializar_aggregates(script_id: str, data: dict, ttl: int, params: dict | None = None):
+    """
+    Calcula y guarda en cache los agregados de un payload.
+    Un agregado roto nunca debe romper los endpoints de filas:
+    cualquier error se loggea y se omite.
+    """
+
+    try:
+        aggregates = compute_aggregates(script_id, data)
+    except Exception as e:
+        logger.error(f"Error calculando agregados para script {script_id} con params {params}: {e}")
+        return None
+
+    if aggregates:
+        kv_set(_cache_key("aggregates", script_id, params), aggregates, ttl_seconds=ttl)
+
+    return aggregates
+
+
+def get_aggregates_with_cache(script_id: str, name: str, ttl: int = 300, params: dict | None = None):
+    """
+    Devuelve las filas de un agregado materializado de un Restlet.
+
+    Flujo técnico:
+    1. Busca los agregados precalculados en Redis.
+    2. Si no están, pasa por call_restlet_with_cache, que los
+       calcula y guarda al refrescar el payload.
+    3. Si el payload ya estaba en cache (o Redis no está
+       disponible) se calculan a partir de él y se guardan con el
+       TTL restante del payload, para que ambos expiren juntos.
+
+    A diferencia de los endpoints de filas, aquí un error de
+    cálculo no se omite: se traduce a HTTPException 500 para no
+    devolver filas vacías que parezcan datos reales.
+    """
+
+    aggregates_key = _cache_key("aggregates", script_id, params)
+
+    cached = kv_get(aggregates_key)
+    if cached and name in cached:
+        logger.info(f"Cache HIT de agregados para script {script_id} con params {params}")
+        return cached[name]
+
+    logger.info(f"Cache MISS de agregados para script {script_id} con params {params}")
+
+    data = call_restlet_with_cache(script_id, ttl=ttl, params=params)
+
+    cached = kv_get(aggregates_key)
+    if cached and name in cached:
+        return cached[name]
+
+    try:
+        aggregates = compute_aggregates(script_id, data)
+    except Exception as e:
+        logger.error(f"Error calculando agregados para script {script_id} con params {params}: {e}")
+        raise HTTPException(status_code=500, detail={"aggregate_error": str(e)})
+
+    if name not in aggregates:
+        raise HTTPException(
+            status_code=500,
+            detail={"aggregate_error": f"Agregado {name} no declarado para script {script_id}"}
+        )
+
+    # TTL restante del payload (-2: no existe, -1: sin expiración)
+    restante = 0
+    if redis:
+        try:
+            restante = redis.ttl(_cache_key("cache", script_id, params))
+        except Exception as e:
+            logger.error(f"Error obteniendo TTL del payload para script {script_id}: {e}")
+
+    if restante and restante > 0:
+        kv_set(aggregates_key, aggregates, ttl_seconds=restante)
+
+    return aggregates[name]
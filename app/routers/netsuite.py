@@ -3,8 +3,9 @@
 # ==========================================================
 # Importaciones
 # ==========================================================
-from fastapi import APIRouter, Query
-from app.netsuite_client import call_restlet_with_cache
+from fastapi import APIRouter, HTTPException, Query
+from app.netsuite_client import call_restlet_with_cache, get_aggregates_with_cache
+from app.services.aggregates import DATASETS
 import logging
 
 router = APIRouter(prefix="/netsuite")
@@ -31,7 +32,7 @@ def instalaciones(case_assigned: str | None = Query(None, description="Filtrar p
     params = {"case_assigned": case_assigned} if case_assigned else None
 
     # TTL de 300 segundos
-    data = call_restlet_with_cache("2089", ttl=300, params=params)
+    data = call_restlet_with_cache(DATASETS["instalaciones"]["script_id"], ttl=300, params=params)
 
     total_inst_caso = len(data.get("total_inst_caso", []))
     lista_art_inst = len(data.get("lista_art_inst", []))
@@ -56,7 +57,7 @@ def instalaciones(case_assigned: str | None = Query(None, description="Filtrar p
 # ==========================================================
 @router.get("/facturacion_areas_tecnicas")
 def facturacion():
-    data = call_restlet_with_cache("2092", ttl=300)
+    data = call_restlet_with_cache(DATASETS["facturacion_areas_tecnicas"]["script_id"], ttl=300)
     total_rows = len(data.get("facturacion_areas_tecnicas", []))
 
     logger.info(
@@ -74,7 +75,7 @@ def facturacion():
 # ==========================================================
 @router.get("/comercial")
 def comercial():
-    data = call_restlet_with_cache("2091", ttl=300)
+    data = call_restlet_with_cache(DATASETS["comercial"]["script_id"], ttl=300)
 
     clientes_potenciales = len(data.get("clientes_potenciales", []))
     oportunidades_cerradas = len(data.get("oportunidades_cerradas", []))
@@ -101,7 +102,7 @@ def posventa(case_assigned: str | None = Query(None, description="Filtrar instal
 
     params = {"case_assigned": case_assigned} if case_assigned else None
 
-    data = call_restlet_with_cache("2121", ttl=300, params=params)
+    data = call_restlet_with_cache(DATASETS["posventa"]["script_id"], ttl=300, params=params)
 
     total_inst_caso = len(data.get("total_inst_caso", []))
     relev_posventa = len(data.get("relev_posventa", []))
@@ -118,4 +119,48 @@ def posventa(case_assigned: str | None = Query(None, description="Filtrar instal
         "total_inst_caso": data.get("total_inst_caso", []),
         "relev_posventa": data.get("relev_posventa", []),
         "oportunidades_articulos": data.get("oportunidades_articulos", [])
-    }
\ No newline at end of file
+    }
+
+
+# ==========================================================
+# Endpoint: Agregados materializados
+# ==========================================================
+@router.get("/{dataset}/aggregates/{name}")
+def aggregates(
+    dataset: str,
+    name: str,
+    case_assigned: str | None = Query(None, description="Filtrar por case_assigned (instalaciones y posventa)")
+):
+    """
+    Expone agregados (count/sum por grupo) precalculados al
+    refrescar la cache del Restlet del dataset, para que Power BI
+    no tenga que descargar ni agregar las filas completas.
+    """
+
+    config = DATASETS.get(dataset)
+    if not config:
+        raise HTTPException(status_code=404, detail=f"Dataset desconocido: {dataset}")
+
+    spec = config["aggregates"].get(name)
+    if not spec:
+        raise HTTPException(status_code=404, detail=f"Agregado desconocido: {dataset}/{name}")
+
+    params = (
+        {"case_assigned": case_assigned}
+        if case_assigned and config["acepta_case_assigned"]
+        else None
+    )
+
+    rows = get_aggregates_with_cache(config["script_id"], name, ttl=300, params=params)
+
+    logger.info(
+        f"Endpoint /{dataset}/aggregates/{name} ejecutado. "
+        f"Grupos devueltos: {len(rows)}."
+    )
+
+    return {
+        "dataset": dataset,
+        "aggregate": name,
+        "group_by": spec["group_by"],
+        "rows": rows
+    }
@@ -0,0 +1,205 @@
+# aggregates.py
+
+# ==========================================================
+# Importaciones
+# ==========================================================
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("netsuite")
+
+
+# ==========================================================
+# Declaración de datasets y agregados
+# ==========================================================
+# Cada dataset expuesto en /netsuite/{dataset} declara:
+# - script_id: Restlet de origen. Es la única fuente del script_id,
+#   los endpoints del router lo leen desde aquí.
+# - acepta_case_assigned: si el Restlet admite el filtro case_assigned.
+# - aggregates: agregados materializados, por nombre. Cada uno indica:
+#     - source: lista a nivel fila del payload (no listas que el
+#       Restlet ya devuelve totalizadas, como total_inst_caso).
+#     - group_by: campos de agrupación.
+#     - sum: campos numéricos a totalizar (opcional).
+#   Cada grupo devuelve los campos de group_by, "count" y un
+#   "sum_<campo>" por cada campo de sum.
+#
+# Solo se declaran agregados cuyas columnas estén confirmadas contra
+# filas reales del Restlet. Si un campo declarado no aparece en
+# ninguna fila, el cálculo falla con AggregateError en lugar de
+# devolver un grupo vacío que Power BI mostraría como dato real.
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "instalaciones": {
+        "script_id": "2089",
+        "acepta_case_assigned": True,
+        "aggregates": {},
+    },
+    "posventa": {
+        "script_id": "2121",
+        "acepta_case_assigned": True,
+        "aggregates": {},
+    },
+    "facturacion_areas_tecnicas": {
+        "script_id": "2092",
+        "acepta_case_assigned": False,
+        "aggregates": {},
+    },
+    "comercial": {
+        "script_id": "2091",
+        "acepta_case_assigned": False,
+        "aggregates": {},
+    },
+}
+
+
+class AggregateError(ValueError):
+    """
+    La declaración de un agregado no coincide con el payload
+    del Restlet (source que no es lista o campos inexistentes).
+    """
+
+
+# ==========================================================
+# Utils
+# ==========================================================
+
+def _a_decimal(valor: Any) -> Optional[Decimal]:
+    """
+    Convierte un valor del Restlet a Decimal.
+    NetSuite suele devolver montos y cantidades como string,
+    por eso se intenta la conversión y se descartan vacíos o
+    valores no numéricos (no suman, pero la fila sí cuenta).
+    Se usa Decimal para que los importes no arrastren ruido
+    de punto flotante.
+    """
+    if valor is None or valor == "" or isinstance(valor, bool):
+        return None
+    try:
+        numero = Decimal(str(valor))
+    except (InvalidOperation, ValueError):
+        return None
+    return numero if numero.is_finite() else None
+
+
+def _normalizar_clave(valor: Any) -> Any:
+    """
+    Convierte un valor de agrupación en algo hasheable.
+    Los campos select de NetSuite llegan como {"value", "text"}:
+    se agrupa por "value". Otros dicts y listas se serializan.
+    """
+    if isinstance(valor, dict):
+        if "value" in valor:
+            return _normalizar_clave(valor["value"])
+        return json.dumps(valor, sort_keys=True, default=str)
+    if isinstance(valor, list):
+        return json.dumps(valor, sort_keys=True, default=str)
+    return valor
+
+
+def _agregar(
+    nombre: str,
+    filas: List[Dict[str, Any]],
+    group_by: List[str],
+    sum_fields: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Agrupa las filas en una sola pasada acumulando count y sumas
+    por grupo. Las filas que no son dict se ignoran. Un campo
+    ausente en algunas filas se agrupa como None, pero si falta en
+    todas se lanza AggregateError. Una suma queda en None si el
+    grupo no tuvo ningún valor numérico.
+    """
+    grupos: Dict[tuple, Dict[str, Any]] = {}
+    sumas: Dict[tuple, Dict[str, Optional[Decimal]]] = {}
+    campos_vistos = set()
+    filas_validas = 0
+
+    for fila in filas:
+        if not isinstance(fila, dict):
+            continue
+
+        filas_validas += 1
+        campos_vistos.update(fila.keys())
+
+        clave = tuple(_normalizar_clave(fila.get(campo)) for campo in group_by)
+        grupo = grupos.get(clave)
+
+        if grupo is None:
+            grupo = dict(zip(group_by, clave))
+            grupo["count"] = 0
+            grupos[clave] = grupo
+            sumas[clave] = {campo: None for campo in sum_fields}
+
+        grupo["count"] += 1
+        for campo in sum_fields:
+            numero = _a_decimal(fila.get(campo))
+            if numero is not None:
+                actual = sumas[clave][campo]
+                sumas[clave][campo] = numero if actual is None else actual + numero
+
+    faltantes = [campo for campo in group_by + sum_fields if campo not in campos_vistos]
+    if filas_validas and faltantes:
+        raise AggregateError(
+            f"Agregado {nombre}: campos ausentes en todas las filas ({filas_validas}): "
+            f"{', '.join(faltantes)}. Revisar la declaración en DATASETS."
+        )
+
+    # float(Decimal) devuelve el flotante más cercano al total exacto
+    # (p.ej. 0.3 y no 0.30000000000000004)
+    for clave, grupo in grupos.items():
+        for campo, total in sumas[clave].items():
+            grupo[f"sum_{campo}"] = float(total) if total is not None else None
+
+    return list(grupos.values())
+
+
+# ==========================================================
+# API del módulo
+# ==========================================================
+
+def aggregates_for_script(script_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Devuelve todos los agregados declarados para un script_id,
+    combinando los de cada dataset que consume ese Restlet.
+    """
+    resultado: Dict[str, Dict[str, Any]] = {}
+    for dataset in DATASETS.values():
+        if dataset["script_id"] == script_id:
+            resultado.update(dataset["aggregates"])
+    return resultado
+
+
+def compute_aggregates(script_id: str, data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Calcula todos los agregados declarados para el payload de un
+    Restlet. Se ejecuta una sola vez por refresh de cache, de modo
+    que los endpoints de agregados sirven resultados precalculados.
+    Lanza AggregateError si una declaración no coincide con el payload.
+    """
+    specs = aggregates_for_script(script_id)
+    resultado: Dict[str, List[Dict[str, Any]]] = {}
+
+    if not specs:
+        return resultado
+
+    if not isinstance(data, dict):
+        raise AggregateError(f"Payload del script {script_id} no es un objeto JSON.")
+
+    for nombre, spec in specs.items():
+        filas = data.get(spec["source"]) or []
+
+        if not isinstance(filas, list):
+            raise AggregateError(
+                f"Agregado {nombre}: '{spec['source']}' no es una lista (script {script_id})."
+            )
+
+        resultado[nombre] = _agregar(nombre, filas, spec["group_by"], spec.get("sum", []))
+
+    logger.info(
+        f"Agregados calculados para script {script_id}: "
+        + ", ".join(f"{nombre}={len(filas)} grupos" for nombre, filas in resultado.items())
+    )
+
+    return resultado
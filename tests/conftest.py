@@ -0,0 +1,27 @@
+# conftest.py
+import pytest
+
+from app.services.aggregates import DATASETS
+
+SCRIPT_PRUEBA = "9999"
+
+
+@pytest.fixture
+def dataset_prueba(monkeypatch):
+    """
+    Registra un dataset de prueba con un agregado declarado,
+    ya que DATASETS solo declara agregados con columnas confirmadas.
+    """
+    config = {
+        "script_id": SCRIPT_PRUEBA,
+        "acepta_case_assigned": False,
+        "aggregates": {
+            "por_area": {
+                "source": "filas",
+                "group_by": ["area"],
+                "sum": ["importe"],
+            },
+        },
+    }
+    monkeypatch.setitem(DATASETS, "prueba", config)
+    return config
@@ -0,0 +1,89 @@
+# test_aggregates.py
+import pytest
+
+from app.services.aggregates import AggregateError, compute_aggregates
+from tests.conftest import SCRIPT_PRUEBA
+
+
+def test_agrupa_select_netsuite_por_value(dataset_prueba):
+    data = {
+        "filas": [
+            {"area": {"value": "1", "text": "Área 1"}, "importe": "2"},
+            {"area": {"value": "1", "text": "Área 1"}, "importe": "3"},
+            {"area": ["a", "b"], "importe": "1"},
+        ]
+    }
+
+    filas = compute_aggregates(SCRIPT_PRUEBA, data)["por_area"]
+
+    assert filas == [
+        {"area": "1", "count": 2, "sum_importe": 5.0},
+        {"area": '["a", "b"]', "count": 1, "sum_importe": 1.0},
+    ]
+
+
+def test_ignora_filas_que_no_son_dict(dataset_prueba):
+    data = {"filas": [{"area": "A", "importe": "1"}, "basura", None, 3]}
+
+    filas = compute_aggregates(SCRIPT_PRUEBA, data)["por_area"]
+
+    assert filas == [{"area": "A", "count": 1, "sum_importe": 1.0}]
+
+
+def test_suma_importes_sin_ruido_de_punto_flotante(dataset_prueba):
+    data = {"filas": [{"area": "A", "importe": "0.1"}, {"area": "A", "importe": 0.2}]}
+
+    filas = compute_aggregates(SCRIPT_PRUEBA, data)["por_area"]
+
+    assert filas == [{"area": "A", "count": 2, "sum_importe": 0.3}]
+
+
+def test_valores_no_numericos_cuentan_pero_no_suman(dataset_prueba):
+    data = {
+        "filas": [
+            {"area": "A", "importe": "10"},
+            {"area": "A", "importe": "n/a"},
+            {"area": "B", "importe": ""},
+            {"area": "B", "importe": "NaN"},
+        ]
+    }
+
+    filas = compute_aggregates(SCRIPT_PRUEBA, data)["por_area"]
+
+    assert filas == [
+        {"area": "A", "count": 2, "sum_importe": 10.0},
+        {"area": "B", "count": 2, "sum_importe": None},
+    ]
+
+
+def test_campo_ausente_en_algunas_filas_se_agrupa_como_none(dataset_prueba):
+    data = {"filas": [{"area": "A", "importe": "1"}, {"importe": "2"}]}
+
+    filas = compute_aggregates(SCRIPT_PRUEBA, data)["por_area"]
+
+    assert filas == [
+        {"area": "A", "count": 1, "sum_importe": 1.0},
+        {"area": None, "count": 1, "sum_importe": 2.0},
+    ]
+
+
+def test_campos_ausentes_en_todas_las_filas_fallan(dataset_prueba):
+    data = {"filas": [{"otro": "x"}, {"otro": "y"}]}
+
+    with pytest.raises(AggregateError, match="area, importe"):
+        compute_aggregates(SCRIPT_PRUEBA, data)
+
+
+def test_source_que_no_es_lista_falla(dataset_prueba):
+    with pytest.raises(AggregateError, match="no es una lista"):
+        compute_aggregates(SCRIPT_PRUEBA, {"filas": {"no": "es lista"}})
+
+
+def test_payload_que_no_es_objeto_falla(dataset_prueba):
+    with pytest.raises(AggregateError):
+        compute_aggregates(SCRIPT_PRUEBA, None)
+
+
+def test_source_vacio_o_script_sin_agregados(dataset_prueba):
+    assert compute_aggregates(SCRIPT_PRUEBA, {"filas": []}) == {"por_area": []}
+    assert compute_aggregates("2091", {"clientes_potenciales": []}) == {}
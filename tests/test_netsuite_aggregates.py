@@ -0,0 +1,163 @@
+# test_netsuite_aggregates.py
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import app.netsuite_client as netsuite_client
+import app.routers.netsuite as netsuite_router
+from app.main import app
+from app.services.aggregates import DATASETS
+from tests.conftest import SCRIPT_PRUEBA
+
+PAYLOAD = {"filas": [{"area": "A", "importe": "1.5"}, {"area": "A", "importe": "2"}]}
+FILAS_AGREGADAS = [{"area": "A", "count": 2, "sum_importe": 3.5}]
+
+
+class FakeRedis:
+    def __init__(self, ttl_restante):
+        self.ttl_restante = ttl_restante
+
+    def ttl(self, key):
+        return self.ttl_restante
+
+
+@pytest.fixture
+def kv(monkeypatch):
+    """
+    Reemplaza el KV de Redis por un dict y registra los TTL usados.
+    """
+    store = {}
+    ttls = {}
+
+    def fake_set(key, value, ttl_seconds=None):
+        store[key] = value
+        ttls[key] = ttl_seconds
+        return True
+
+    monkeypatch.setattr(netsuite_client, "kv_get", store.get)
+    monkeypatch.setattr(netsuite_client, "kv_set", fake_set)
+    monkeypatch.setattr(netsuite_client, "redis", None)
+    return store, ttls
+
+
+@pytest.fixture
+def restlet(monkeypatch):
+    llamadas = []
+
+    def fake_call(script_id, deploy_id="1", params=None):
+        llamadas.append((script_id, params))
+        return PAYLOAD
+
+    monkeypatch.setattr(netsuite_client, "_call_restlet_sync", fake_call)
+    return llamadas
+
+
+def test_refresh_guarda_agregados_junto_al_payload(dataset_prueba, kv, restlet):
+    store, ttls = kv
+
+    data = netsuite_client.call_restlet_with_cache(SCRIPT_PRUEBA, ttl=120)
+
+    assert data == PAYLOAD
+    aggregates_key = netsuite_client._cache_key("aggregates", SCRIPT_PRUEBA)
+    assert store[aggregates_key] == {"por_area": FILAS_AGREGADAS}
+    assert ttls[aggregates_key] == 120
+
+
+def test_refresh_no_falla_si_el_agregado_esta_roto(dataset_prueba, kv, monkeypatch):
+    store, _ = kv
+    monkeypatch.setattr(netsuite_client, "_call_restlet_sync", lambda *a, **k: {"filas": [{"x": 1}]})
+
+    data = netsuite_client.call_restlet_with_cache(SCRIPT_PRUEBA, ttl=120)
+
+    assert data == {"filas": [{"x": 1}]}
+    assert netsuite_client._cache_key("aggregates", SCRIPT_PRUEBA) not in store
+
+
+def test_agregados_con_payload_cacheado_usan_ttl_restante(dataset_prueba, kv, restlet, monkeypatch):
+    store, ttls = kv
+    store[netsuite_client._cache_key("cache", SCRIPT_PRUEBA)] = PAYLOAD
+    monkeypatch.setattr(netsuite_client, "redis", FakeRedis(ttl_restante=42))
+
+    filas = netsuite_client.get_aggregates_with_cache(SCRIPT_PRUEBA, "por_area", ttl=300)
+
+    assert filas == FILAS_AGREGADAS
+    assert restlet == []
+    assert ttls[netsuite_client._cache_key("aggregates", SCRIPT_PRUEBA)] == 42
+
+
+def test_agregados_sin_ttl_restante_no_se_guardan(dataset_prueba, kv, restlet, monkeypatch):
+    store, _ = kv
+    store[netsuite_client._cache_key("cache", SCRIPT_PRUEBA)] = PAYLOAD
+    monkeypatch.setattr(netsuite_client, "redis", FakeRedis(ttl_restante=-2))
+
+    filas = netsuite_client.get_aggregates_with_cache(SCRIPT_PRUEBA, "por_area", ttl=300)
+
+    assert filas == FILAS_AGREGADAS
+    assert netsuite_client._cache_key("aggregates", SCRIPT_PRUEBA) not in store
+
+
+@pytest.mark.parametrize("ttl_restante", [42, -2])
+def test_agregado_roto_responde_500(dataset_prueba, kv, monkeypatch, ttl_restante):
+    store, _ = kv
+    store[netsuite_client._cache_key("cache", SCRIPT_PRUEBA)] = {"filas": [{"x": 1}]}
+    monkeypatch.setattr(netsuite_client, "redis", FakeRedis(ttl_restante=ttl_restante))
+
+    with pytest.raises(HTTPException) as exc:
+        netsuite_client.get_aggregates_with_cache(SCRIPT_PRUEBA, "por_area")
+
+    assert exc.value.status_code == 500
+    assert "area, importe" in exc.value.detail["aggregate_error"]
+
+
+def test_endpoint_devuelve_agregado(dataset_prueba, kv, restlet):
+    response = TestClient(app).get("/netsuite/prueba/aggregates/por_area")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "dataset": "prueba",
+        "aggregate": "por_area",
+        "group_by": ["area"],
+        "rows": FILAS_AGREGADAS,
+    }
+
+
+@pytest.mark.parametrize("path", [
+    "/netsuite/inexistente/aggregates/por_area",
+    "/netsuite/prueba/aggregates/inexistente",
+])
+def test_endpoint_404_para_dataset_o_agregado_desconocido(dataset_prueba, path):
+    assert TestClient(app).get(path).status_code == 404
+
+
+def test_endpoint_ignora_case_assigned_en_facturacion(dataset_prueba, monkeypatch):
+    llamadas = []
+    facturacion = DATASETS["facturacion_areas_tecnicas"]
+    monkeypatch.setitem(facturacion, "aggregates", dataset_prueba["aggregates"])
+
+    def fake_get(script_id, name, ttl=300, params=None):
+        llamadas.append((script_id, params))
+        return []
+
+    monkeypatch.setattr(netsuite_router, "get_aggregates_with_cache", fake_get)
+
+    response = TestClient(app).get(
+        "/netsuite/facturacion_areas_tecnicas/aggregates/por_area?case_assigned=123"
+    )
+
+    assert response.status_code == 200
+    assert llamadas == [(facturacion["script_id"], None)]
+
+
+def test_endpoint_pasa_case_assigned_si_el_dataset_lo_acepta(dataset_prueba, monkeypatch):
+    llamadas = []
+    dataset_prueba["acepta_case_assigned"] = True
+
+    def fake_get(script_id, name, ttl=300, params=None):
+        llamadas.append(params)
+        return []
+
+    monkeypatch.setattr(netsuite_router, "get_aggregates_with_cache", fake_get)
+
+    TestClient(app).get("/netsuite/prueba/aggregates/por_area?case_assigned=123")
+
+    assert llamadas == [{"case_assigned": "123"}]